@@ -3,31 +3,55 @@ Multi-provider geocoding service with automatic fallback.
 Supports LocationIQ, OpenCage, Geoapify, Positionstack, and Nominatim.
 """
 import os
+import json
 import time
 import logging
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Optional, Tuple
+from urllib3.util.retry import Retry
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut, GeocoderServiceError
 
 logger = logging.getLogger("MarketDetective.Geocoder")
 
+CACHE_FILE = "geocode_cache.json"
+
 
 class GeocodingService:
     """
     Multi-provider geocoding service with automatic fallback.
     Tries providers in order until one succeeds or all fail.
+    Results are memoized per address and persisted to CACHE_FILE.
     """
 
-    def __init__(self):
+    def __init__(self, cache_file: str = CACHE_FILE):
         # Load API keys from environment
         self.locationiq_key = os.getenv("LOCATIONIQ_API_KEY")
         self.opencage_key = os.getenv("OPENCAGE_API_KEY")
         self.geoapify_key = os.getenv("GEOAPIFY_API_KEY")
         self.positionstack_key = os.getenv("POSITIONSTACK_API_KEY")
 
+        # One pooled keep-alive session for every HTTP provider, with backoff on
+        # rate limits and transient server errors. raise_on_status=False hands the
+        # final response back so the 429 checks below still apply.
+        retry = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"],
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=retry)
+        self._session = requests.Session()
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
         # Initialize Nominatim as last resort
         self.nominatim = Nominatim(user_agent="market_detective_scraper")
+        # Nominatim allows one request per second, even when geocode() is called from several threads
+        self._nominatim_lock = threading.Lock()
 
         # Track which providers are available
         self.providers = []
@@ -43,6 +67,37 @@ class GeocodingService:
 
         logger.info(f"Initialized geocoding service with providers: {', '.join(self.providers)}")
 
+        # Address -> (lat, lon). Listings repeat locations heavily, so most lookups hit here.
+        self.cache_file = cache_file
+        self._cache = {}
+        self._load_cache()
+
+    def _load_cache(self):
+        """Load previously geocoded addresses from disk."""
+        try:
+            with open(self.cache_file, 'r') as f:
+                self._cache = {address: tuple(coords) for address, coords in json.load(f).items()}
+            logger.info(f"Loaded {len(self._cache)} cached geocodes")
+        except FileNotFoundError:
+            pass  # Nothing cached yet
+        except Exception as e:
+            logger.error(f"Failed to load geocode cache: {e}")
+
+    def save_cache(self):
+        """Persist successful geocodes so later runs can skip them."""
+        # Write to a temp file and swap it in, so a crash mid-write can't truncate the cache
+        tmp_file = f"{self.cache_file}.tmp"
+        try:
+            with open(tmp_file, 'w') as f:
+                json.dump({
+                    address: coords
+                    for address, coords in self._cache.items()
+                    if coords[0] is not None and coords[1] is not None
+                }, f, indent=4)
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            logger.error(f"Failed to save geocode cache: {e}")
+
     def geocode(self, address: str) -> Tuple[Optional[float], Optional[float]]:
         """
         Geocode an address using available providers with automatic fallback.
@@ -57,6 +112,9 @@ class GeocodingService:
             logger.warning("Empty address provided for geocoding")
             return None, None
 
+        if address in self._cache:
+            return self._cache[address]
+
         # Enhance address with country for better results
         query = f"{address}, Nigeria"
 
@@ -66,12 +124,15 @@ class GeocodingService:
                 lat, lon = self._geocode_with_provider(provider, query)
                 if lat is not None and lon is not None:
                     logger.info(f"Successfully geocoded '{address}' using {provider}")
+                    self._cache[address] = (lat, lon)
                     return lat, lon
             except Exception as e:
                 logger.warning(f"Provider {provider} failed for '{address}': {e}")
                 continue
 
         logger.error(f"All geocoding providers failed for address: {address}")
+        # Remember the miss for this run only; save_cache() doesn't persist it
+        self._cache[address] = (None, None)
         return None, None
 
     def _geocode_with_provider(self, provider: str, query: str) -> Tuple[Optional[float], Optional[float]]:
@@ -110,7 +171,7 @@ class GeocodingService:
             "countrycodes": "ng"
         }
 
-        response = requests.get(url, params=params, timeout=10)
+        response = self._session.get(url, params=params, timeout=10)
 
         if response.status_code == 429:
             raise Exception("Rate limit exceeded")
@@ -134,7 +195,7 @@ class GeocodingService:
             "countrycode": "ng"
         }
 
-        response = requests.get(url, params=params, timeout=10)
+        response = self._session.get(url, params=params, timeout=10)
 
         if response.status_code == 429:
             raise Exception("Rate limit exceeded")
@@ -158,7 +219,7 @@ class GeocodingService:
             "filter": "countrycode:ng"
         }
 
-        response = requests.get(url, params=params, timeout=10)
+        response = self._session.get(url, params=params, timeout=10)
 
         if response.status_code == 429:
             raise Exception("Rate limit exceeded")
@@ -183,7 +244,7 @@ class GeocodingService:
             "country": "ng"
         }
 
-        response = requests.get(url, params=params, timeout=10)
+        response = self._session.get(url, params=params, timeout=10)
 
         if response.status_code == 429:
             raise Exception("Rate limit exceeded")
@@ -201,8 +262,9 @@ class GeocodingService:
         """Geocode using Nominatim (OpenStreetMap) - last resort due to rate limits."""
         try:
             # Nominatim requires 1 second between requests
-            time.sleep(1)
-            location = self.nominatim.geocode(query, timeout=10, country_codes="ng")
+            with self._nominatim_lock:
+                time.sleep(1)
+                location = self.nominatim.geocode(query, timeout=10, country_codes="ng")
             if location:
                 return location.latitude, location.longitude
         except (GeocoderTimedOut, GeocoderServiceError) as e:
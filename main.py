@@ -1,6 +1,5 @@
 import asyncio
 import json
-import os
 import time
 import logging
 from datetime import datetime
@@ -25,30 +24,34 @@ load_dotenv()
 
 METADATA_FILE = "scrape_metadata_propro.json"
 
+# How many geocode lookups may be in flight at once
+GEOCODE_CONCURRENCY = 10
+
 class ScraperState:
     def __init__(self):
         self.last_page = 0
-        self.scraped_pages = []
+        self.scraped_pages = set()
         self.total_records = 0
         self.load()
 
     def load(self):
-        if os.path.exists(METADATA_FILE):
-            try:
-                with open(METADATA_FILE, 'r') as f:
-                    data = json.load(f)
-                    self.last_page = data.get('last_page', 0)
-                    self.scraped_pages = data.get('scraped_pages', [])
-                    self.total_records = data.get('total_records', 0)
-            except Exception as e:
-                logger.error(f"Failed to load metadata: {e}")
+        try:
+            with open(METADATA_FILE, 'r') as f:
+                data = json.load(f)
+                self.last_page = data.get('last_page', 0)
+                self.scraped_pages = set(data.get('scraped_pages', []))
+                self.total_records = data.get('total_records', 0)
+        except FileNotFoundError:
+            pass  # First run, start fresh
+        except Exception as e:
+            logger.error(f"Failed to load metadata: {e}")
 
     def save(self):
         try:
             with open(METADATA_FILE, 'w') as f:
                 json.dump({
                     'last_page': self.last_page,
-                    'scraped_pages': sorted(list(set(self.scraped_pages))),
+                    'scraped_pages': sorted(self.scraped_pages),
                     'total_records': self.total_records,
                     'last_updated': datetime.now().isoformat()
                 }, f, indent=4)
@@ -56,8 +59,8 @@ class ScraperState:
             logger.error(f"Failed to save metadata: {e}")
 
 
-async def save_propro_to_db(db, property_data, lat, lon):
-    """Save a PropertyPro property to the database."""
+def build_propro_row(property_data, lat, lon):
+    """Build the PropertyPro create payload for a scraped property, or None if unusable."""
     try:
         url = property_data.get('URL', '')
         if not url:
@@ -73,48 +76,108 @@ async def save_propro_to_db(db, property_data, lat, lon):
         furnished_status = property_data.get('Furnished')
         is_furnished = furnished_status is not None and ('furnished' in furnished_status.lower() or 'yes' in furnished_status.lower())
 
-        prop = await db.propertypro.upsert(
-            where={'url': url},
-            data={
-                'create': {
-                    'title': property_data.get('Property Name', 'Unknown'),
-                    'url': url,
-                    'description': property_data.get('Description', ''),
-                    'address': property_data.get('Location', 'Unknown'),
-                    'city': property_data.get('City', 'Unknown'),
-                    'state': property_data.get('State', 'Lagos'),
-                    'latitude': lat,
-                    'longitude': lon,
-                    'price': sale_price,
-                    'beds': beds,
-                    'baths': baths,
-                    'amenities': features,
-                    'images': images,
-                    'furnished': is_furnished,
-                },
-                'update': {
-                    'title': property_data.get('Property Name', 'Unknown'),
-                    'description': property_data.get('Description', ''),
-                    'address': property_data.get('Location', 'Unknown'),
-                    'city': property_data.get('City', 'Unknown'),
-                    'state': property_data.get('State', 'Lagos'),
-                    'latitude': lat,
-                    'longitude': lon,
-                    'price': sale_price,
-                    'beds': beds,
-                    'baths': baths,
-                    'amenities': features,
-                    'images': images,
-                    'furnished': is_furnished,
-                    'updatedAt': datetime.now()
-                }
-            }
+        return {
+            'title': property_data.get('Property Name', 'Unknown'),
+            'url': url,
+            'description': property_data.get('Description', ''),
+            'address': property_data.get('Location', 'Unknown'),
+            'city': property_data.get('City', 'Unknown'),
+            'state': property_data.get('State', 'Lagos'),
+            'latitude': lat,
+            'longitude': lon,
+            'price': sale_price,
+            'beds': beds,
+            'baths': baths,
+            'amenities': features,
+            'images': images,
+            'furnished': is_furnished,
+        }
+    except Exception as e:
+        logger.error(f"Failed to build PropertyPro row (URL: {property_data.get('URL')}): {e}")
+        return None
+
+async def upsert_propro_row(db, row):
+    """Upsert a single PropertyPro row. Used when a batched step fails, so one bad row can't sink the page."""
+    update = {key: value for key, value in row.items() if key != 'url'}
+    update['updatedAt'] = datetime.now()
+    try:
+        return await db.propertypro.upsert(
+            where={'url': row['url']},
+            data={'create': row, 'update': update}
         )
-        return prop
     except Exception as e:
-        logger.error(f"Failed to save PropertyPro to DB (URL: {property_data.get('URL')}): {e}")
+        logger.error(f"Failed to save PropertyPro to DB (URL: {row['url']}): {e}")
         return None
 
+async def upsert_propro_rows(db, rows):
+    """Upsert rows one at a time. Returns the number saved."""
+    saved = 0
+    for row in rows:
+        if await upsert_propro_row(db, row):
+            saved += 1
+    return saved
+
+async def save_propro_batch(db, listings, coords):
+    """
+    Save a page of PropertyPro properties to the database in a few round trips:
+    one lookup for URLs already stored, one create_many for the new ones and a
+    single batched transaction updating the rest. If any batched step fails,
+    its rows fall back to per-row upserts. Returns the number saved.
+    """
+    rows = {}
+    for item in listings:
+        lat, lon = coords[item.get('Location', '')]
+        row = build_propro_row(item, lat, lon)
+        if row:
+            rows[row['url']] = row  # A URL listed twice on a page keeps its last copy
+
+    if not rows:
+        return 0
+
+    try:
+        existing = await db.propertypro.find_many(where={'url': {'in': list(rows)}})
+        existing_urls = {prop.url for prop in existing}
+    except Exception as e:
+        logger.error(f"PropertyPro lookup failed, saving {len(rows)} properties one by one: {e}")
+        return await upsert_propro_rows(db, rows.values())
+
+    saved = 0
+
+    new_rows = [row for url, row in rows.items() if url not in existing_urls]
+    if new_rows:
+        try:
+            saved += await db.propertypro.create_many(data=new_rows, skip_duplicates=True)
+        except Exception as e:
+            logger.error(f"PropertyPro create_many failed, saving {len(new_rows)} new properties one by one: {e}")
+            saved += await upsert_propro_rows(db, new_rows)
+
+    if existing_urls:
+        update_rows = [rows[url] for url in existing_urls]
+        try:
+            now = datetime.now()
+            async with db.batch_() as batcher:
+                for row in update_rows:
+                    data = {key: value for key, value in row.items() if key != 'url'}
+                    data['updatedAt'] = now
+                    batcher.propertypro.update(where={'url': row['url']}, data=data)
+            saved += len(update_rows)
+        except Exception as e:
+            logger.error(f"PropertyPro batch update failed, saving {len(update_rows)} existing properties one by one: {e}")
+            saved += await upsert_propro_rows(db, update_rows)
+
+    return saved
+
+async def geocode_addresses(geocoder, addresses):
+    """Geocode addresses concurrently. Returns {address: (lat, lon)}."""
+    sem = asyncio.Semaphore(GEOCODE_CONCURRENCY)
+
+    async def lookup(address):
+        async with sem:
+            # The providers use blocking HTTP, so run each lookup in a worker thread
+            return address, await asyncio.to_thread(geocoder.geocode, address)
+
+    return dict(await asyncio.gather(*(lookup(address) for address in addresses)))
+
 async def main():
     state = ScraperState()
     geocoder = GeocodingService()
@@ -136,21 +199,18 @@ async def main():
                 logger.info(f"No more listings found on page {page_num}. Stopping.")
                 break
 
-            for item in listings:
-                # Geocode
-                address = item.get('Location', '')
-                lat, lon = geocoder.geocode(address)
-
-                # Save to DB
-                prop = await save_propro_to_db(db, item, lat, lon)
+            # Geocode each distinct address once; listings share locations heavily
+            addresses = {item.get('Location', '') for item in listings}
+            coords = await geocode_addresses(geocoder, addresses)
 
-                if prop:
-                    state.total_records += 1
+            # Save to DB
+            state.total_records += await save_propro_batch(db, listings, coords)
 
             # Update state after each page to protect against crashes
             state.last_page = page_num
-            state.scraped_pages.append(page_num)
+            state.scraped_pages.add(page_num)
             state.save()
+            geocoder.save_cache()
             logger.info(f"Finished page {page_num}. Total records so far: {state.total_records}")
 
             # Politeness
@@ -161,6 +221,7 @@ async def main():
     finally:
         await db.disconnect()
         state.save()
+        geocoder.save_cache()
         logger.info("Scraper finished.")
 
 if __name__ == "__main__":
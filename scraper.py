@@ -1,79 +1,206 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from bs4 import BeautifulSoup, SoupStrainer
 from cleaners import clean_price_string
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from importlib.metadata import PackageNotFoundError, version
+from urllib.parse import urljoin
 import re
 import time
 import json
 import logging
+import threading
+
+try:
+    import orjson  # Optional: faster JSON-LD decoding / list encoding
+except ImportError:
+    orjson = None
+
+try:
+    # Optional: on-disk HTTP cache so re-runs don't re-download detail pages.
+    # Needs requests-cache >= 1.0 (DO_NOT_CACHE, only_if_cached expiry handling).
+    from requests_cache import CachedSession, DO_NOT_CACHE
+    if int(version("requests-cache").split('.')[0]) < 1:
+        raise ImportError("requests-cache >= 1.0 required")
+except (ImportError, PackageNotFoundError, ValueError):
+    CachedSession = None
+
+# Logging is configured by the entry point (main.py); configuring it here at
+# import time would pre-empt main.py's basicConfig and drop its file handler.
+logger = logging.getLogger("MarketDetective.Scraper")
+
+BASE_URL = "https://propertypro.ng"
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml",
+    # gzip/deflate, plus br when brotli is installed (only advertise what urllib3 can decode)
+    "Accept-Encoding": ACCEPT_ENCODING,
+    "Connection": "keep-alive"
+}
+
+# Concurrency / politeness settings
+MAX_WORKERS = 12
+MAX_IN_FLIGHT = MAX_WORKERS * 2  # Detail pages queued or awaiting the consumer at once
+REQUEST_INTERVAL = 0.3  # Minimum seconds between any two requests, across all workers
+
+# Detail-page cache (used when requests-cache is installed). Search pages are
+# never cached, since their contents shift as listings are added.
+HTTP_CACHE_NAME = "propertypro_cache"  # SQLite file: propertypro_cache.sqlite
+HTTP_CACHE_EXPIRE_AFTER = 24 * 3600  # seconds
+
+# Only the listing cards on a search page are needed, so don't build the rest of the tree.
+# While parsing, the strainer sees the raw class attribute string (e.g.
+# "pl-title-grid position-relative"), so match on its split tokens.
+SEARCH_STRAINER = SoupStrainer(class_=lambda c: c is not None and 'pl-title-grid' in c.split())
+
+# Precompiled patterns for the detail-page parsers
+_FEATURES_RE = re.compile(r'^Features$', re.IGNORECASE)
+_ADDRESS_RE = re.compile(r'Property address|address', re.IGNORECASE)
+_ICON_RE = re.compile(r'icon', re.IGNORECASE)
+
+
+# Whitespace as it can appear in undecoded HTML: ASCII, &nbsp; / &#160; entities and UTF-8 NBSP
+_RAW_SPACE = rb'(?:\s|&nbsp;|&#160;|&#xa0;|\xc2\xa0)*'
+
+
+def _stat_pattern(label):
+    """'<n> label' count pattern (bytes) used by the get_stat raw-HTML fallback."""
+    return re.compile(rb'(\d+)' + _RAW_SPACE + re.escape(label.encode()), re.IGNORECASE)
+
+
+_STAT_RES = {label: _stat_pattern(label) for label in ('Bed', 'Bath', 'Toilet')}
+
+# JSON-LD keys holding each stat, in preference order
+_STAT_KEYS = {
+    'bed': ('numberOfBedrooms',),
+    'bath': ('numberOfBathroomsTotal', 'numberOfBathrooms'),
+}
+
+# Furnished status phrases, checked in priority order
+_FURNISHED_RE = re.compile(
+    rb'(?P<fully>fully\s+furnished)|(?P<partially>partially\s+furnished)|(?P<unfurnished>unfurnished)',
+    re.IGNORECASE
+)
+_FURNISHED_STATUSES = [
+    ('fully', 'Fully Furnished'),
+    ('partially', 'Partially Furnished'),
+    ('unfurnished', 'Unfurnished'),
+]
+
+# Property types in match priority order. At each position the regex tries
+# alternatives left to right, so a longer type ("Semi Detached Duplex") is taken
+# whole rather than leaving a shorter one it contains ("Detached Duplex").
+PROPERTY_TYPES = [
+    'Detached Duplex', 'Semi Detached Duplex', 'Terrace Duplex',
+    'Duplex', 'Detached House', 'Semi Detached House',
+    'Terraced House', 'Bungalow', 'Apartment', 'Flat',
+    'Condominium', 'Villa', 'Townhouse'
+]
+_TYPE_RE = re.compile('|'.join(re.escape(t) for t in PROPERTY_TYPES), re.IGNORECASE)
+_TYPE_PRIORITY = {t.lower(): i for i, t in enumerate(PROPERTY_TYPES)}
+
+# Common Nigerian states to look for, in match priority order
+STATES = [
+    'Lagos', 'Abuja', 'Rivers', 'Ogun', 'Oyo', 'Kano', 'Kaduna',
+    'Bauchi', 'Edo', 'Delta', 'Enugu', 'Imo', 'Kwara', 'Kogi',
+    'Osun', 'Ondo', 'Cross River', 'Taraba', 'Adamawa', 'Yobe',
+    'Borno', 'Jigawa', 'Kebbi', 'Katsina', 'Sokoto', 'Zamfara',
+    'Nassarawa', 'Niger', 'Plateau', 'Gombe', 'Ekiti', 'Bayelsa'
+]
+_STATE_RE = re.compile(r'\b(' + '|'.join(re.escape(s) for s in STATES) + r')\b', re.IGNORECASE)
+_STATE_PRIORITY = {s.lower(): i for i, s in enumerate(STATES)}
+
+
+def _json_loads(text):
+    return orjson.loads(text) if orjson else json.loads(text)
+
+def _json_dumps(value):
+    return orjson.dumps(value).decode() if orjson else json.dumps(value)
+
+
+class RateLimiter:
+    """
+    Spaces requests out by a fixed interval, shared by every worker thread,
+    so concurrent workers don't hammer the site.
+    """
 
-# Setup logging for this module
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger("Scraper")
-
-def get_stat(soup, label):
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+def extract_jsonld(soup):
+    """
+    Decode every JSON-LD block on the page once, so the helpers below can share
+    the result instead of each re-finding and re-parsing the scripts.
+    """
+    blocks = []
+    for script in soup.find_all('script', {'type': 'application/ld+json'}):
+        if script.string is None:
+            continue
+        try:
+            # orjson rejects str subclasses such as bs4's Script, so pass a plain str
+            data = _json_loads(str(script.string))
+        except (ValueError, TypeError):
+            continue
+        if isinstance(data, list):
+            blocks.extend(item for item in data if isinstance(item, dict))
+        elif isinstance(data, dict):
+            blocks.append(data)
+    return blocks
+
+def get_stat(ld, html, label):
     """
     Extract stats like 'Bed', 'Bath', 'Toilet' from the detail page.
     Extracts from JSON-LD structured data which is more reliable than HTML selectors.
     """
     # Try to extract from JSON-LD schema data
-    schema_scripts = soup.find_all('script', {'type': 'application/ld+json'})
-    for script in schema_scripts:
-        try:
-            data = json.loads(script.string)
-            if label.lower() == 'bed':
-                bedrooms = data.get('numberOfBedrooms')
-                if bedrooms is not None:
-                    return int(bedrooms)
-            elif label.lower() == 'bath':
-                bathrooms = data.get('numberOfBathroomsTotal') or data.get('numberOfBathrooms')
-                if bathrooms is not None:
-                    return int(bathrooms)
-        except:
-            pass
-
-    # Fallback: search in page text for the stat
-    stats_alt = soup.find_all(string=re.compile(label, re.IGNORECASE))
-    for text in stats_alt:
-        match = re.search(r'(\d+)\s*' + label, text, re.IGNORECASE)
-        if match:
-            return int(match.group(1))
-
-    return 0
+    for key in _STAT_KEYS.get(label.lower(), ()):
+        for data in ld:
+            value = data.get(key)
+            if value is not None:
+                try:
+                    return int(value)
+                except (ValueError, TypeError):
+                    pass
+
+    # Fallback: a single regex pass over the raw HTML finds "4 Beds" style text
+    # without walking the parsed tree
+    num_re = _STAT_RES.get(label) or _stat_pattern(label)
+    match = num_re.search(html)
+    return int(match.group(1)) if match else 0
 
 def get_property_type(name):
     """
     Extract property type (Duplex, Flat, House, Bungalow, etc.) from property name.
     """
-    name_lower = name.lower()
-
-    # Check for property types in order of specificity
-    types = [
-        'Detached Duplex', 'Semi Detached Duplex', 'Terrace Duplex',
-        'Duplex', 'Detached House', 'Semi Detached House',
-        'Terraced House', 'Bungalow', 'Apartment', 'Flat',
-        'Condominium', 'Villa', 'Townhouse'
-    ]
+    # One scan finds every candidate; when several types appear, the one
+    # earliest in PROPERTY_TYPES wins
+    matches = _TYPE_RE.finditer(name)
+    match = min(matches, key=lambda m: _TYPE_PRIORITY[m.group(0).lower()], default=None)
+    return PROPERTY_TYPES[_TYPE_PRIORITY[match.group(0).lower()]] if match else "Other"
 
-    for ptype in types:
-        if ptype.lower() in name_lower:
-            return ptype
-
-    return "Other"
-
-def get_description(soup):
+def get_description(ld):
     """Extract description from JSON-LD schema."""
-    schema_scripts = soup.find_all('script', {'type': 'application/ld+json'})
-    for script in schema_scripts:
-        try:
-            data = json.loads(script.string)
-            if data.get('@type') in ['RealEstateListing', 'SingleFamilyResidence']:
-                desc = data.get('description', '')
-                if desc:
-                    # Clean up the description - remove duplicates and truncate
-                    desc = desc.split('See property details')[0].strip()
-                    return desc[:500]  # Limit to 500 chars
-        except:
-            pass
+    for data in ld:
+        if data.get('@type') in ['RealEstateListing', 'SingleFamilyResidence']:
+            desc = data.get('description', '')
+            if desc and isinstance(desc, str):
+                # Clean up the description - remove duplicates and truncate
+                desc = desc.split('See property details')[0].strip()
+                return desc[:500]  # Limit to 500 chars
     return ""
 
 def get_images(soup):
@@ -86,52 +213,44 @@ def get_images(soup):
             image_urls.append(src)
     return image_urls
 
-def get_furnished_status(soup):
-    """Detect furnished status from page text."""
-    page_text = soup.get_text().lower()
-    if 'fully furnished' in page_text:
-        return 'Fully Furnished'
-    elif 'partially furnished' in page_text:
-        return 'Partially Furnished'
-    elif 'unfurnished' in page_text:
-        return 'Unfurnished'
+def get_furnished_status(html):
+    """
+    Detect furnished status from the raw page HTML (bytes). A regex over the
+    response avoids building the whole page's text just for three checks.
+    """
+    found = {match.lastgroup for match in _FURNISHED_RE.finditer(html)}
+    for key, status in _FURNISHED_STATUSES:
+        if key in found:
+            return status
     return None
 
+@lru_cache(maxsize=4096)  # Listings in the same estate share identical location strings
 def parse_location(location_text):
     """Parse location into city and state."""
     if not location_text:
         return "", ""
 
-    # Common Nigerian states to look for
-    states = [
-        'Lagos', 'Abuja', 'Rivers', 'Ogun', 'Oyo', 'Kano', 'Kaduna',
-        'Bauchi', 'Edo', 'Delta', 'Enugu', 'Imo', 'Kwara', 'Kogi',
-        'Osun', 'Ondo', 'Cross River', 'Taraba', 'Adamawa', 'Yobe',
-        'Borno', 'Jigawa', 'Kebbi', 'Katsina', 'Sokoto', 'Zamfara',
-        'Nassarawa', 'Niger', 'Plateau', 'Gombe', 'Ekiti', 'Bayelsa'
-    ]
-
     state = ""
     city = ""
 
-    # First, try to find a state name in the location text
-    for s in states:
-        if s.lower() in location_text.lower():
-            state = s
-            # Extract everything before the state as city
-            # Look for the word/phrase before state
-            idx = location_text.lower().find(s.lower())
-            before_state = location_text[:idx].strip()
-
-            # Get the last meaningful part before state (usually the immediate preceding word/phrase)
-            if before_state:
-                # Split by space and get the last word(s)
-                words = before_state.split()
-                # Take the last word as the primary city identifier
-                city = words[-1] if words else before_state
-            else:
-                city = location_text.split()[0] if location_text.split() else ""
-            break
+    # First, try to find a state name in the location text. One scan finds every
+    # candidate; when several states appear, the one earliest in STATES wins.
+    matches = _STATE_RE.finditer(location_text)
+    match = min(matches, key=lambda m: _STATE_PRIORITY[m.group(1).lower()], default=None)
+    if match:
+        state = STATES[_STATE_PRIORITY[match.group(1).lower()]]
+        # Extract everything before the state as city
+        # Look for the word/phrase before state
+        before_state = location_text[:match.start()].strip()
+
+        # Get the last meaningful part before state (usually the immediate preceding word/phrase)
+        if before_state:
+            # Split by space and get the last word(s)
+            words = before_state.split()
+            # Take the last word as the primary city identifier
+            city = words[-1] if words else before_state
+        else:
+            city = location_text.split()[0] if location_text.split() else ""
 
     # If no state found, try to guess from the text
     if not state:
@@ -152,9 +271,137 @@ def parse_location(location_text):
 
     return city, state
 
-def scrape_properties(pages=1, start_page=1):
+def get_listing_urls(session, limiter, page_num):
+    """Collect the detail-page URL of every listing on a search results page."""
+    urls = []
+    logger.info(f"Scanning page {page_num}...")
+    search_url = f"{BASE_URL}/property-for-sale/house?page={page_num}"
+
+    try:
+        limiter.wait()
+        response = session.get(search_url)
+        soup = BeautifulSoup(response.content, 'lxml', parse_only=SEARCH_STRAINER)
+
+        # The search page container
+        containers = soup.find_all(class_='pl-title-grid')
+        logger.info(f"Found {len(containers)} listings on search page {page_num}")
+
+        for house in containers:
+            link_tag = house.find('a')
+            href = link_tag.get('href') if link_tag else None
+            if not href:
+                continue
+
+            # Handles relative and absolute hrefs alike
+            urls.append(urljoin(BASE_URL + '/', href))
+    except Exception as e:
+        logger.error(f"Error scanning page {page_num}: {e}")
+
+    return urls
+
+def fetch_listing_page(session, limiter, url):
+    """
+    GET a detail page, answering from the local cache when there's a fresh entry.
+    Only requests that actually go to the server wait on the rate limiter.
+    """
+    if CachedSession and isinstance(session, CachedSession):
+        # Returns a 504 instead of hitting the network when the entry is missing or expired
+        response = session.get(url, only_if_cached=True)
+        if response.status_code != 504:
+            return response
+    limiter.wait()
+    return session.get(url)
+
+def scrape_listing(session, limiter, property_url):
+    """Fetch and parse a single property detail page. Returns None if it can't be used."""
+    try:
+        prop_res = fetch_listing_page(session, limiter, property_url)
+        prop_soup = BeautifulSoup(prop_res.content, 'lxml')
+        ld = extract_jsonld(prop_soup)
+
+        # UPDATED SELECTORS based on live site audit
+        h1 = prop_soup.find('h1', class_='page-heading')
+
+        price_container = prop_soup.find('div', class_='property-pricing')
+        price = price_container.find('h2') if price_container else None
+
+        if not (h1 and price):
+            logger.warning(f"Missing core data (Name/Price) for {property_url}")
+            return None
+
+        property_name = h1.get_text().strip()
+
+        # Location is in the first <p> tag after the h1 title
+        location = h1.find_next('p')
+        # Fallback: if not found, search for location patterns
+        if not location:
+            location = prop_soup.find('p', string=_ADDRESS_RE)
+            if location:
+                location = location.find_next_sibling('p') or location
+
+        # Features list - extracted from feature icons (img alt text)
+        features = []
+        features_header = prop_soup.find(string=_FEATURES_RE)
+        if features_header:
+            features_container = features_header.find_parent(['div', 'section'])
+            if features_container:
+                # Features are shown as images with alt text like "Feature Name-icon"
+                feature_images = features_container.find_all('img', alt=_ICON_RE)
+                features = [img.get('alt', '').replace('-icon', '').strip() for img in feature_images]
+
+        location_text = location.get_text().strip() if location else "N/A"
+        city, state = parse_location(location_text)
+
+        listing = {
+            "Property Name": property_name,
+            "Property Type": get_property_type(property_name),
+            "Description": get_description(ld),
+            "Price": clean_price_string(price.get_text().strip()),
+            "Bedrooms": get_stat(ld, prop_res.content, "Bed"),
+            "Baths": get_stat(ld, prop_res.content, "Bath"),
+            "Toilets": get_stat(ld, prop_res.content, "Toilet"),
+            "Location": location_text,
+            "City": city,
+            "State": state,
+            "Country": "Nigeria",
+            "Images": _json_dumps(get_images(prop_soup)),
+            "Furnished": get_furnished_status(prop_res.content),
+            "Features": _json_dumps(features),
+            "URL": property_url
+        }
+        logger.info(f"Extracted: {property_name[:40]}...")
+        return listing
+    except Exception as e:
+        logger.error(f"Error on property page: {e}")
+        return None
+
+def make_session():
+    """
+    Build a keep-alive session sized for MAX_WORKERS concurrent requests,
+    backed by the on-disk detail-page cache when requests-cache is available.
+    """
+    if CachedSession:
+        session = CachedSession(
+            HTTP_CACHE_NAME,
+            expire_after=HTTP_CACHE_EXPIRE_AFTER,
+            urls_expire_after={"propertypro.ng/property-for-sale/*": DO_NOT_CACHE}
+        )
+    else:
+        session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def iter_properties(pages=1, start_page=1):
     """
-    Scrape properties from PropertyPro.
+    Scrape properties from PropertyPro, yielding each one as soon as it's parsed
+    (in page / listing order). At most MAX_IN_FLIGHT detail pages are queued or
+    held at once, so a slow consumer doesn't make finished listings pile up.
+
+    Search pages and then detail pages are fetched concurrently over a shared
+    keep-alive session; a single RateLimiter paces requests across all workers.
 
     Parameters:
     -----------
@@ -163,100 +410,41 @@ def scrape_properties(pages=1, start_page=1):
     start_page : int
         Starting page number (default: 1)
     """
-    all_listings = []
-    base_url = "https://propertypro.ng"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
-    }
+    limiter = RateLimiter(REQUEST_INTERVAL)
+    page_numbers = range(start_page, start_page + pages)
 
-    for page_num in range(start_page, start_page + pages):
-        logger.info(f"Scanning page {page_num}...")
-        search_url = f"{base_url}/property-for-sale/house?page={page_num}"
+    with make_session() as session, ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        # map() keeps results in page order
+        property_urls = iter([
+            url
+            for page_urls in executor.map(lambda n: get_listing_urls(session, limiter, n), page_numbers)
+            for url in page_urls
+        ])
 
-        try:
-            response = requests.get(search_url, headers=headers)
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # The search page container
-            containers = soup.find_all(class_='pl-title-grid')
-            logger.info(f"Found {len(containers)} listings on search page")
-
-            for house in containers: 
-                link_tag = house.find('a')
-                if not link_tag or not link_tag.get('href'):
-                    continue
-                
-                property_url = base_url + link_tag.get('href')
-                # Avoid relative paths vs full paths issues
-                if not property_url.startswith('http'):
-                    property_url = base_url + "/" + link_tag.get('href').lstrip('/')
-
-                # Step 2: Visit the detail page
-                try:
-                    prop_res = requests.get(property_url, headers=headers)
-                    prop_soup = BeautifulSoup(prop_res.text, 'html.parser')
-
-                    # UPDATED SELECTORS based on live site audit
-                    name = prop_soup.find('h1', class_='page-heading')
-                    
-                    price_container = prop_soup.find('div', class_='property-pricing')
-                    price = price_container.find('h2') if price_container else None
-                    
-                    # Location is in the first <p> tag after the h1 title
-                    location = None
-                    h1 = prop_soup.find('h1', class_='page-heading')
-                    if h1:
-                        location = h1.find_next('p')
-                    # Fallback: if not found, search for location patterns
-                    if not location:
-                        location = prop_soup.find('p', string=re.compile(r'Property address|address', re.IGNORECASE))
-                        if location:
-                            location = location.find_next_sibling('p') or location
-
-                    # Features list - extracted from feature icons (img alt text)
-                    features = []
-                    features_header = prop_soup.find(string=re.compile(r'^Features$', re.IGNORECASE))
-                    if features_header:
-                        features_container = features_header.find_parent(['div', 'section'])
-                        if features_container:
-                            # Features are shown as images with alt text like "Feature Name-icon"
-                            feature_images = features_container.find_all('img', alt=re.compile('icon', re.IGNORECASE))
-                            features = [img.get('alt', '').replace('-icon', '').strip() for img in feature_images]
-
-                    if name and price:
-                        property_name = name.get_text().strip()
-                        location_text = location.get_text().strip() if location else "N/A"
-                        city, state = parse_location(location_text)
-
-                        all_listings.append({
-                            "Property Name": property_name,
-                            "Property Type": get_property_type(property_name),
-                            "Description": get_description(prop_soup),
-                            "Price": clean_price_string(price.get_text().strip()),
-                            "Bedrooms": get_stat(prop_soup, "Bed"),
-                            "Baths": get_stat(prop_soup, "Bath"),
-                            "Toilets": get_stat(prop_soup, "Toilet"),
-                            "Location": location_text,
-                            "City": city,
-                            "State": state,
-                            "Country": "Nigeria",
-                            "Images": json.dumps(get_images(prop_soup)),
-                            "Furnished": get_furnished_status(prop_soup),
-                            "Features": json.dumps(features),
-                            "URL": property_url
-                        })
-                        logger.info(f"Extracted: {name.get_text().strip()[:40]}...")
-                    else:
-                        logger.warning(f"Missing core data (Name/Price) for {property_url}")
-
-                    time.sleep(0.3)
-                except Exception as e:
-                    logger.error(f"Error on property page: {e}")
-
-            time.sleep(1)
-        except Exception as e:
-            logger.error(f"Error scanning page {page_num}: {e}")
-    
-    return all_listings
+        pending = deque()
 
+        def submit_next():
+            url = next(property_urls, None)
+            if url is not None:
+                pending.append(executor.submit(scrape_listing, session, limiter, url))
 
+        for _ in range(MAX_IN_FLIGHT):
+            submit_next()
+
+        try:
+            while pending:
+                listing = pending.popleft().result()
+                submit_next()  # Top up only as results are handed out
+                if listing:
+                    yield listing
+        finally:
+            # If the caller stops early, cancel the fetches that haven't started yet
+            for future in pending:
+                future.cancel()
+
+def scrape_properties(pages=1, start_page=1):
+    """
+    Scrape properties from PropertyPro and return them as a list.
+    See iter_properties for the parameters and a streaming alternative.
+    """
+    return list(iter_properties(pages=pages, start_page=start_page))
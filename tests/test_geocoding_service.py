@@ -0,0 +1,20 @@
+import json
+
+from geocoding_service import GeocodingService
+
+
+def test_save_cache_replaces_file_atomically(tmp_path):
+    cache_file = tmp_path / "geocode_cache.json"
+    cache_file.write_text(json.dumps({"Old Address": [1.0, 2.0]}))
+
+    geocoder = GeocodingService(cache_file=str(cache_file))
+    geocoder._cache["Lekki Phase 1"] = (6.44, 3.47)
+    geocoder._cache["Nowhere"] = (None, None)
+    geocoder.save_cache()
+
+    assert json.loads(cache_file.read_text()) == {
+        "Old Address": [1.0, 2.0],
+        "Lekki Phase 1": [6.44, 3.47],
+    }
+    assert not (tmp_path / "geocode_cache.json.tmp").exists()
+    assert GeocodingService(cache_file=str(cache_file))._cache["Lekki Phase 1"] == (6.44, 3.47)
@@ -0,0 +1,180 @@
+import io
+import time
+
+import pytest
+from urllib3 import HTTPResponse
+
+import scraper
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeSession:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def get(self, url, **kwargs):
+        return FakeResponse(self.pages[url])
+
+
+class NoWaitLimiter:
+    def wait(self):
+        pass
+
+
+SEARCH_PAGE = b"""
+<html><body>
+  <div class="pl-title-grid position-relative"><a href="/property/multi-class">Multi</a></div>
+  <div class="pl-title-grid"><a href="/property/single-class">Single</a></div>
+  <div class="something-else"><a href="/property/not-a-card">Other</a></div>
+</body></html>
+"""
+
+
+def test_get_listing_urls_keeps_multi_class_cards():
+    url = f"{scraper.BASE_URL}/property-for-sale/house?page=1"
+    session = FakeSession({url: SEARCH_PAGE})
+
+    urls = scraper.get_listing_urls(session, NoWaitLimiter(), 1)
+
+    assert urls == [
+        f"{scraper.BASE_URL}/property/multi-class",
+        f"{scraper.BASE_URL}/property/single-class",
+    ]
+
+
+DETAIL_JSONLD = """
+<html><head>
+<script type="application/ld+json">
+{"@type": "RealEstateListing", "description": "Nice home.", "numberOfBedrooms": 3, "numberOfBathroomsTotal": 2}
+</script>
+<script type="application/ld+json"></script>
+</head><body></body></html>
+"""
+
+
+def test_extract_jsonld_with_orjson():
+    if scraper.orjson is None:
+        pytest.skip("orjson not installed")
+    soup = scraper.BeautifulSoup(DETAIL_JSONLD, 'lxml')
+
+    ld = scraper.extract_jsonld(soup)
+
+    assert scraper.get_description(ld) == "Nice home."
+    assert scraper.get_stat(ld, b"", "Bed") == 3
+    assert scraper.get_stat(ld, b"", "Bath") == 2
+
+
+def test_extract_jsonld_without_orjson(monkeypatch):
+    monkeypatch.setattr(scraper, "orjson", None)
+    soup = scraper.BeautifulSoup(DETAIL_JSONLD, 'lxml')
+
+    ld = scraper.extract_jsonld(soup)
+
+    assert scraper.get_description(ld) == "Nice home."
+    assert scraper.get_stat(ld, b"", "Bath") == 2
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.waits = 0
+
+    def wait(self):
+        self.waits += 1
+
+
+class FakeAdapter(scraper.HTTPAdapter):
+    """Answers every request locally and counts how many reached the 'server'."""
+
+    def __init__(self):
+        super().__init__()
+        self.sent = 0
+
+    def send(self, request, **kwargs):
+        self.sent += 1
+        response = scraper.requests.Response()
+        response.status_code = 200
+        response.headers["Content-Type"] = "text/html"
+        response._content = b"<html></html>"
+        response.raw = HTTPResponse(
+            body=io.BytesIO(response._content),
+            status=200,
+            headers=response.headers,
+            preload_content=False,
+            request_url=request.url,
+        )
+        response.url = request.url
+        response.request = request
+        return response
+
+
+def test_fetch_listing_page_only_skips_limiter_on_fresh_cache_hit():
+    if scraper.CachedSession is None:
+        pytest.skip("requests-cache >= 1.0 not installed")
+    import requests_cache
+
+    session = scraper.CachedSession(backend="memory", expire_after=60)
+    adapter = FakeAdapter()
+    session.mount("https://", adapter)
+    limiter = CountingLimiter()
+    url = f"{scraper.BASE_URL}/property/cached-home"
+
+    scraper.fetch_listing_page(session, limiter, url)
+    scraper.fetch_listing_page(session, limiter, url)
+    assert (adapter.sent, limiter.waits) == (1, 1)
+
+    # Once the entry expires the request goes to the server again, and must be throttled
+    session.cache.reset_expiration(requests_cache.EXPIRE_IMMEDIATELY)
+    scraper.fetch_listing_page(session, limiter, url)
+    assert (adapter.sent, limiter.waits) == (2, 2)
+
+
+def test_iter_properties_bounds_in_flight_fetches(monkeypatch):
+    submitted = []
+    urls = [f"{scraper.BASE_URL}/property/{n}" for n in range(scraper.MAX_IN_FLIGHT * 5)]
+    monkeypatch.setattr(scraper, "REQUEST_INTERVAL", 0)
+    # Plain session: don't create the on-disk requests-cache file from a test
+    monkeypatch.setattr(scraper, "CachedSession", None)
+    monkeypatch.setattr(scraper, "get_listing_urls", lambda session, limiter, page_num: urls)
+
+    def fake_scrape_listing(session, limiter, url):
+        submitted.append(url)
+        return {"URL": url}
+
+    monkeypatch.setattr(scraper, "scrape_listing", fake_scrape_listing)
+
+    listings = scraper.iter_properties(pages=1)
+    first = next(listings)
+    # Consumer is paused: give the workers time to drain everything they were handed
+    time.sleep(0.2)
+
+    assert first == {"URL": urls[0]}
+    assert len(submitted) <= scraper.MAX_IN_FLIGHT + 1
+
+    rest = list(listings)
+    assert [listing["URL"] for listing in [first, *rest]] == urls
+
+
+@pytest.mark.parametrize("html", [
+    b"<span>5 Toilets</span>",
+    b"<span>5&nbsp;Toilets</span>",
+    b"<span>5&#160;Toilets</span>",
+    "<span>5\u00a0Toilets</span>".encode("utf-8"),
+])
+def test_get_stat_raw_fallback_handles_html_spaces(html):
+    assert scraper.get_stat([], html, "Toilet") == 5
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("3 Bedroom Flat / Apartment For Sale", "Apartment"),
+    ("Apartment Duplex In Lekki", "Duplex"),
+    ("5 Bedroom Detached Duplex", "Detached Duplex"),
+    ("4 Bedroom Semi Detached Duplex", "Semi Detached Duplex"),
+    ("3 bedroom terraced house", "Terraced House"),
+    ("Plot Of Land", "Other"),
+])
+def test_get_property_type_keeps_list_priority(name, expected):
+    assert scraper.get_property_type(name) == expected